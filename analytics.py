@@ -0,0 +1,124 @@
+"""
+Analytics Module
+Arrival-time statistics for staffing the gate: per-minute histogram, peak
+window, late-arrival rates against a cutoff and day-of-week comparisons.
+Attendance is pulled per (day, minute) as column arrays and every statistic
+is a vectorized NumPy operation over them.
+"""
+from datetime import timedelta
+
+import numpy as np
+
+from dbhelper import EPOCH, get_arrival_counts
+
+MINUTES_PER_DAY = 1440
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+def day_label(day):
+    return (EPOCH + timedelta(days=int(day))).strftime('%Y-%m-%d')
+
+def minute_label(minute):
+    return f"{int(minute) // 60:02d}:{int(minute) % 60:02d}"
+
+def parse_cutoff(cutoff):
+    """'HH:MM' -> minute of day"""
+    hours, minutes = cutoff.split(':')
+    minute = int(hours) * 60 + int(minutes)
+    if not 0 <= minute < MINUTES_PER_DAY:
+        raise ValueError(f"cutoff out of range: {cutoff}")
+    return minute
+
+def weighted_quantile_minute(histogram, q):
+    """Minute at quantile `q` of a per-minute arrival histogram"""
+    cumulative = np.cumsum(histogram)
+    return int(np.searchsorted(cumulative, q * cumulative[-1]))
+
+def arrival_stats(start, end, cutoff='08:00', window=15, course=None, level=None):
+    """
+    Arrival statistics between `start` and `end` (inclusive).
+    A scan is late when it falls in a minute after the cutoff minute.
+    `window` is the peak-window width in minutes.
+    """
+    cutoff_minute = parse_cutoff(cutoff)
+    if not 1 <= window <= MINUTES_PER_DAY:
+        raise ValueError(f"window must be 1-{MINUTES_PER_DAY} minutes: {window}")
+    days, minutes, counts = (np.asarray(column, dtype=np.int64)
+                             for column in get_arrival_counts(start, end, course, level))
+
+    result = {
+        'start': start,
+        'end': end,
+        'cutoff': cutoff,
+        'window_minutes': window,
+        'total_scans': int(counts.sum()),
+        'days': int(np.unique(days).size),
+    }
+    if counts.size == 0:
+        result.update(histogram=None, arrival_quantiles=None, peak=None, late=None, weekdays=[])
+        return result
+
+    histogram = np.bincount(minutes, weights=counts, minlength=MINUTES_PER_DAY)
+    first, last = np.flatnonzero(histogram)[[0, -1]]
+
+    # Peak window: moving sum over `window` minutes
+    moving = np.convolve(histogram, np.ones(window), mode='valid')
+    peak_start = int(np.argmax(moving))
+
+    late_mask = minutes > cutoff_minute
+    late_scans = int(counts[late_mask].sum())
+
+    # Per-day late rates, one bincount over the day index
+    day_values, day_index = np.unique(days, return_inverse=True)
+    per_day_total = np.bincount(day_index, weights=counts)
+    per_day_late = np.bincount(day_index, weights=counts * late_mask)
+    per_day_rate = per_day_late / per_day_total
+
+    # Day-of-week: 1970-01-01 was a Thursday (weekday 3)
+    weekday = (days + 3) % 7
+    weekday_histograms = np.bincount(
+        weekday * MINUTES_PER_DAY + minutes, weights=counts, minlength=7 * MINUTES_PER_DAY
+    ).reshape(7, MINUTES_PER_DAY)
+    weekday_days = np.bincount((day_values + 3) % 7, minlength=7)
+    weekday_late = np.bincount(weekday, weights=counts * late_mask, minlength=7)
+
+    weekdays = []
+    for index in np.flatnonzero(weekday_days):
+        weekday_histogram = weekday_histograms[index]
+        scans = weekday_histogram.sum()
+        weekdays.append({
+            'weekday': WEEKDAYS[index],
+            'days': int(weekday_days[index]),
+            'mean_scans_per_day': round(float(scans / weekday_days[index]), 1),
+            'median_arrival': minute_label(weighted_quantile_minute(weekday_histogram, 0.5)),
+            'late_rate': round(float(weekday_late[index] / scans), 4),
+        })
+
+    result.update(
+        histogram={
+            'first_minute': minute_label(first),
+            'counts': histogram[first:last + 1].astype(int).tolist(),
+        },
+        arrival_quantiles={
+            'p10': minute_label(weighted_quantile_minute(histogram, 0.10)),
+            'median': minute_label(weighted_quantile_minute(histogram, 0.50)),
+            'p90': minute_label(weighted_quantile_minute(histogram, 0.90)),
+            'mean': minute_label(float(np.average(np.arange(MINUTES_PER_DAY), weights=histogram))),
+        },
+        peak={
+            'start': minute_label(peak_start),
+            'end': minute_label(peak_start + window - 1),
+            'scans': int(moving[peak_start]),
+            'share': round(float(moving[peak_start] / histogram.sum()), 4),
+            'mean_per_day': round(float(moving[peak_start] / day_values.size), 1),
+        },
+        late={
+            'scans': late_scans,
+            'rate': round(late_scans / result['total_scans'], 4),
+            'worst_day': day_label(day_values[np.argmax(per_day_rate)]),
+            'worst_day_rate': round(float(per_day_rate.max()), 4),
+            'best_day': day_label(day_values[np.argmin(per_day_rate)]),
+            'best_day_rate': round(float(per_day_rate.min()), 4),
+        },
+        weekdays=weekdays,
+    )
+    return result
@@ -1,3 +1,6 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 from flask import (
     Flask, render_template, redirect, url_for, request, session, flash, 
     jsonify, send_file, make_response
@@ -6,18 +9,23 @@ from dbhelper import (
     init_database, getone, getall, addrecord, updaterecord, deleterecord, recordexists,
     recordexists_exclude,
     get_user_by_email, get_all_users, delete_user, get_student_by_idno,
-    record_attendance, get_attendance_by_date, get_attendance_today
+    get_attendance_by_date,
+    ROSTER_FIELDS, get_roster_snapshot, get_roster_changes,
+    get_absentees, get_absence_summary, day_number, get_roster_version, get_changed_idnos,
+    get_students, get_sections
 )
+from imagestore import save_image, remove_image_if_unused
+from rendercache import RenderCache
+from scanning import process_scan
+from request_profiler import init_request_profiler
 from werkzeug.security import generate_password_hash, check_password_hash
-import qrcode
-import qrcode.constants 
 import io
 from io import BytesIO 
 import base64
+import hmac
 import os
-from datetime import datetime
-import traceback 
-import json
+import threading
+from datetime import datetime, timedelta
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here-change-this'
@@ -25,12 +33,55 @@ app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching for development
 
 # IMPORTANT: UPLOAD_FOLDER is for STUDENT IMAGES ONLY
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'static', 'images')
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Use Flask route to serve the actual default icon file
 DEFAULT_ICON = '/default-icon'
 
-init_database()
+# Closed-day attendance listings are cached; set ATTENDANCE_CACHE_DIR to keep them on disk too
+app.config['ATTENDANCE_CACHE_SIZE'] = 256
+app.config['ATTENDANCE_CACHE_DIR'] = os.environ.get('ATTENDANCE_CACHE_DIR')
+attendance_cache = RenderCache(app.config['ATTENDANCE_CACHE_SIZE'], app.config['ATTENDANCE_CACHE_DIR'])
+
+# Kiosks authenticate roster sync with this shared token in the X-Kiosk-Token header.
+# Unset means only logged-in admins can read the roster.
+app.config['KIOSK_TOKEN'] = os.environ.get('KIOSK_TOKEN')
+
+# Admin-only cProfile runs (X-Profile: 1 or ?_profile=1); set PROFILE_DIR to enable
+init_request_profiler(app)
+
+# Set STARTUP_PROFILE=1 to print import and init timings
+STARTUP_PROFILE = os.environ.get('STARTUP_PROFILE', '') not in ('', '0')
+STARTUP_TIMINGS = {'imports': time.perf_counter() - _IMPORT_STARTED}
+
+_initialized = False
+_init_lock = threading.Lock()
+
+def report_startup_timings():
+    parts = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in STARTUP_TIMINGS.items())
+    print(f"[STARTUP] {parts}")
+
+def ensure_initialized():
+    """
+    Create the upload folder and database tables once per process.
+    Runs on the first request instead of at import, so importing app stays cheap.
+    """
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        started = time.perf_counter()
+        os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+        init_database()
+        STARTUP_TIMINGS['init'] = time.perf_counter() - started
+        _initialized = True
+    if STARTUP_PROFILE:
+        report_startup_timings()
+
+@app.before_request
+def initialize_on_first_request():
+    ensure_initialized()
 
 def rows_to_dicts(rows):
     return [dict(row) for row in rows]
@@ -41,13 +92,25 @@ def row_to_dict(row):
 def get_user_by_id(user_id):
     return getone('users', id=user_id)
 
+def kiosk_authorized():
+    """Logged-in admin, or a request carrying the configured kiosk token"""
+    if 'user_id' in session:
+        return True
+    token = app.config['KIOSK_TOKEN']
+    supplied = request.headers.get('X-Kiosk-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
 
 # Utilities
 
 def generate_qr_code_image(idno):
     """
     Generate QR code image.
+    qrcode (and Pillow behind it) is only imported the first time a QR is drawn.
     """
+    import qrcode
+    import qrcode.constants
+
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_H, 
@@ -69,6 +132,63 @@ def generate_qr_code_uri(idno):
     return f"data:image/webp;base64,{img_str}"
 
 
+def load_attendance_records(date, course=None, level=None):
+    records = rows_to_dicts(get_attendance_by_date(date, course, level))
+
+    # time_in_12h is formatted by SQLite, no per-row strptime needed
+    for record in records:
+        record['time_in'] = record.pop('time_in_12h')
+    return records
+
+def get_attendance_records(date, course=None, level=None, version=None):
+    """
+    Attendance listing for `date`. Past days are served from attendance_cache;
+    today (and later) always hits the database since scans are still coming in.
+    A cached day is reused while none of its students appear in the roster
+    change log since it was built, so renames and deletes from any worker
+    invalidate it. Section-filtered entries are dropped on any roster change,
+    since a student moving into the section would not be in their idnos.
+    `version` is the current roster version, if the caller already has it.
+    """
+    if date >= datetime.now().strftime("%Y-%m-%d"):
+        return load_attendance_records(date, course, level)
+
+    key = ('attendance', date, course, level)
+    if version is None:
+        version = get_roster_version()
+    entry = attendance_cache.get(key)
+    if entry:
+        if entry['version'] == version:
+            return entry['value']
+        if entry['version'] < version:
+            changed = get_changed_idnos(entry['version'])
+            if not (changed & set(entry['idnos']) or (changed and (course or level))):
+                attendance_cache.put(key, version, entry['idnos'], entry['value'])
+                return entry['value']
+
+    records = load_attendance_records(date, course, level)
+    attendance_cache.put(key, version, {record['idno'] for record in records}, records)
+    return records
+
+def get_section_filters(version):
+    """
+    Course and level choices for the filter dropdowns. Sections only change
+    with the roster, so the list is cached against the roster version.
+    """
+    key = ('sections',)
+    entry = attendance_cache.get(key)
+    if entry and entry['version'] == version:
+        return entry['value']
+
+    sections = rows_to_dicts(get_sections())
+    filters = {
+        'courses': sorted({section['course'] for section in sections}),
+        'levels': sorted({section['level'] for section in sections})
+    }
+    attendance_cache.put(key, version, (), filters)
+    return filters
+
+
 # Routes
 # Routes
 # Routes
@@ -299,7 +419,10 @@ def student_management():
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    students = rows_to_dicts(getall('students'))
+    selected_course = request.args.get('course') or None
+    selected_level = request.args.get('level') or None
+    students = rows_to_dicts(get_students(selected_course, selected_level))
+    section_filters = get_section_filters(get_roster_version())
 
     try:
         students.sort(key=lambda x: int(x.get('idno', '0')))
@@ -313,7 +436,10 @@ def student_management():
         else:
             student['image_url'] = DEFAULT_ICON
 
-    return render_template("student_management.html", students=students)
+    return render_template(
+        "student_management.html", students=students, **section_filters,
+        selected_course=selected_course, selected_level=selected_level
+    )
 
 @app.route("/delete-student/<idno>")
 def delete_student(idno):
@@ -321,27 +447,10 @@ def delete_student(idno):
         return redirect(url_for('login'))
 
     student = row_to_dict(get_student_by_idno(idno))
+    # Attendance rows go in the same statement through ON DELETE CASCADE
     if deleterecord('students', idno=idno):
-        conn = __import__('dbhelper').connect()
-        cur = conn.cursor()
-        try:
-            cur.execute("DELETE FROM attendance WHERE idno=?", (idno,))
-            conn.commit()
-            deleted_count = cur.rowcount
-            if deleted_count > 0:
-                print(f"[CLEANUP] Deleted {deleted_count} attendance records for student {idno}")
-        except Exception as e:
-            print(f"Error deleting attendance records: {e}")
-        finally:
-            conn.close()
-        
-        if student and student.get('image_filename'):
-            filepath = os.path.join(UPLOAD_FOLDER, student['image_filename'])
-            try:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-            except Exception as e:
-                print("Error deleting image file:", e)
+        if student:
+            remove_image_if_unused(student.get('image_filename'), UPLOAD_FOLDER)
         
         flash("Student and all associated attendance records deleted.", "success") 
     else:
@@ -399,19 +508,12 @@ def save_student():
                 return redirect(url_for('camera_viewer', update_idno=update_idno))
 
         new_filename = None
-        filepath = None
 
         if webcam_image_data and webcam_image_data.strip():
             try:
                 base64_image = webcam_image_data.split(',')[1] if ',' in webcam_image_data else webcam_image_data
                 image_bytes = base64.b64decode(base64_image)
-
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                new_filename = f"{idno}_{timestamp}.jpg"
-                filepath = os.path.join(UPLOAD_FOLDER, new_filename)
-
-                with open(filepath, 'wb') as f:
-                    f.write(image_bytes)
+                new_filename = save_image(image_bytes, UPLOAD_FOLDER)
             except Exception as e:
                 flash(f"Error saving new image: {e}", "error")
                 return redirect(url_for('camera_viewer', update_idno=update_idno))
@@ -427,31 +529,14 @@ def save_student():
             update_kwargs['image_filename'] = new_filename
 
         if updaterecord('students', 'idno', update_idno, **update_kwargs):
-            if idno != update_idno:
-                conn = __import__('dbhelper').connect()
-                cur = conn.cursor()
-                try:
-                    cur.execute("UPDATE attendance SET idno=? WHERE idno=?", (idno, update_idno))
-                    conn.commit()
-                    print(f"Updated attendance records from {update_idno} to {idno}")
-                except Exception as e:
-                    print(f"Error updating attendance records: {e}")
-                finally:
-                    conn.close()
-            
-            if new_filename and existing_student.get('image_filename'):
-                old_filepath = os.path.join(UPLOAD_FOLDER, existing_student['image_filename'])
-                try:
-                    if os.path.exists(old_filepath):
-                        os.remove(old_filepath)
-                except Exception as e:
-                    print(f"Error removing old image: {e}")
+            # Attendance references students.id, so an idno change needs no history rewrite
+            if new_filename:
+                remove_image_if_unused(existing_student.get('image_filename'), UPLOAD_FOLDER)
 
             flash("Student updated successfully!", "success")
             return redirect(url_for('student_management'))
         else:
-            if filepath and os.path.exists(filepath):
-                os.remove(filepath)
+            remove_image_if_unused(new_filename, UPLOAD_FOLDER)
             flash("Database error updating student.", "error")
             return redirect(url_for('camera_viewer', update_idno=update_idno))
     else:
@@ -466,13 +551,7 @@ def save_student():
         try:
             base64_image = webcam_image_data.split(',')[1] if ',' in webcam_image_data else webcam_image_data
             image_bytes = base64.b64decode(base64_image)
-
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            filename = f"{idno}_{timestamp}.jpg"
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-
-            with open(filepath, 'wb') as f:
-                f.write(image_bytes)
+            filename = save_image(image_bytes, UPLOAD_FOLDER)
         except Exception as e:
             flash(f"Error saving image: {e}", "error")
             return redirect(url_for('camera_viewer'))
@@ -482,8 +561,7 @@ def save_student():
             flash("Student saved successfully!", "success")
             return redirect(url_for('student_management'))
 
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        remove_image_if_unused(filename, UPLOAD_FOLDER)
         flash("Database error saving student.", "error")
         return redirect(url_for('camera_viewer'))
 
@@ -503,26 +581,91 @@ def view_attendance():
     else:
         selected_date = datetime.now().strftime("%Y-%m-%d")
     
-    records = rows_to_dicts(get_attendance_by_date(selected_date))
-
-    for record in records:
-        time_24h = record.get('time_in')
-        if time_24h:
-            try:
-                time_to_parse = time_24h.split('.')[0]
-                time_obj = datetime.strptime(time_to_parse, "%H:%M:%S")
-                time_12h = time_obj.strftime("%I:%M %p").lstrip('0')
-                record['time_in'] = time_12h
-            except ValueError:
-                pass 
+    selected_course = request.args.get('course') or None
+    selected_level = request.args.get('level') or None
+    version = get_roster_version()
+    records = get_attendance_records(selected_date, selected_course, selected_level, version)
     
-    return render_template("view_attendance.html", records=records, selected_date=selected_date)
+    return render_template(
+        "view_attendance.html", records=records, selected_date=selected_date,
+        **get_section_filters(version),
+        selected_course=selected_course, selected_level=selected_level
+    )
+
+@app.route("/absentees")
+def absentees():
+    """
+    Who is missing: ?date=YYYY-MM-DD for one day, or ?start=...&end=... for
+    per-student absence counts and streaks over a term. Optional ?course= and ?level=.
+    """
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    course = request.args.get('course') or None
+    level = request.args.get('level') or None
+    start = request.args.get('start')
+    end = request.args.get('end')
+
+    try:
+        if start or end:
+            if not (start and end):
+                return jsonify({"success": False, "message": "Both start and end are required"}), 400
+            if day_number(start) > day_number(end):
+                return jsonify({"success": False, "message": "start must not be after end"}), 400
+            school_days, rows = get_absence_summary(start, end, course, level)
+            return jsonify({
+                "success": True,
+                "start": start,
+                "end": end,
+                "school_days": school_days,
+                "students": rows
+            })
+
+        date = request.args.get('date') or datetime.now().strftime("%Y-%m-%d")
+        rows = get_absentees(date, course, level)
+    except ValueError:
+        return jsonify({"success": False, "message": "Dates must be YYYY-MM-DD"}), 400
+
+    return jsonify({
+        "success": True,
+        "date": date,
+        "count": len(rows),
+        "absentees": rows_to_dicts(rows)
+    })
+
+@app.route("/analytics/arrivals")
+def arrival_analytics():
+    """
+    Gate arrival statistics as JSON. ?start=&end= (default: the last 365 days),
+    ?cutoff=HH:MM for late arrivals, ?window= peak-window minutes, ?course=&level=.
+    """
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+
+    # NumPy is only loaded when analytics are first requested
+    from analytics import arrival_stats
+
+    today = datetime.now()
+    end = request.args.get('end') or today.strftime("%Y-%m-%d")
+    start = request.args.get('start') or (today - timedelta(days=364)).strftime("%Y-%m-%d")
+    try:
+        stats = arrival_stats(
+            start, end,
+            cutoff=request.args.get('cutoff') or '08:00',
+            window=int(request.args.get('window') or 15),
+            course=request.args.get('course') or None,
+            level=request.args.get('level') or None
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": f"Invalid parameter: {e}"}), 400
+
+    return jsonify({"success": True, **stats})
 
 @app.route("/scan-attendance", methods=['POST'])
 def scan_attendance():
     """
     Processes QR scan and records attendance. 
-    Ensures time is displayed as H:M AM/PM without seconds.
+    The scan itself is scanning.process_scan, shared with scan_gateway.py.
     """
     idno = None
 
@@ -534,6 +677,7 @@ def scan_attendance():
         if not idno:
             raw_data = request.data.decode('utf-8')
             if raw_data:
+                import json
                 try:
                     data_fallback = json.loads(raw_data)
                     idno = data_fallback.get('idno')
@@ -543,48 +687,47 @@ def scan_attendance():
     except Exception:
         return jsonify({"success": False, "message": "Server processing error during request retrieval"}), 500
 
-    if not idno:
-        return jsonify({"success": False, "message": "No ID provided"}), 400
-
-    student = row_to_dict(get_student_by_idno(idno))
-    if not student:
-        return jsonify({"success": False, "message": f"Student with ID {idno} not found"}), 404
-    
-    now = datetime.now()
-    date_str = now.strftime("%Y-%m-%d")
-    time_str = now.strftime("%I:%M %p").lstrip('0') 
-    existing = get_attendance_today(idno, date_str)
-    
-    if existing:
-        existing_dict = dict(existing) if existing else None
-        existing_time_24h = existing_dict.get('time_in')
-        existing_time_12h = "N/A"
-        
-        if existing_time_24h:
-            try:
-                time_to_parse = existing_time_24h.split('.')[0] 
-                time_obj = datetime.strptime(time_to_parse, "%H:%M:%S")
-                existing_time_12h = time_obj.strftime("%I:%M %p").lstrip('0')
-            except ValueError:
-                existing_time_12h = existing_time_24h 
+    payload, status = process_scan(idno)
+    return jsonify(payload), status
 
-        return jsonify({
-            "success": True, 
-            "student": student,
-            "message": f"Attendance already recorded today at {existing_time_12h}"
-        })
-    
-    if record_attendance(idno):
-        return jsonify({
-            "success": True, 
-            "student": student,
-            "message": f"Attendance recorded successfully at {time_str}"
-        })
-    else:
-        return jsonify({
-            "success": False, 
-            "message": "Database error recording attendance"
-        }), 500
+@app.route("/roster/snapshot")
+def roster_snapshot():
+    """
+    Full roster for offline kiosks, as compact rows in ROSTER_FIELDS order.
+    Kiosks keep the returned version and poll /roster/changes from there.
+    """
+    if not kiosk_authorized():
+        return jsonify({"success": False, "message": "Kiosk token required"}), 401
+
+    version, rows = get_roster_snapshot()
+    return jsonify({
+        "version": version,
+        "fields": list(ROSTER_FIELDS),
+        "students": rows
+    })
+
+@app.route("/roster/changes")
+def roster_changes():
+    """
+    Roster deltas after ?since=<version>. If the kiosk is ahead of the
+    server (e.g. restored database) it is told to re-download the snapshot.
+    """
+    if not kiosk_authorized():
+        return jsonify({"success": False, "message": "Kiosk token required"}), 401
+
+    since = request.args.get('since', type=int)
+    if since is None or since < 0:
+        return jsonify({"success": False, "message": "since must be a non-negative integer"}), 400
+
+    version, upserts, deletes = get_roster_changes(since)
+    return jsonify({
+        "version": version,
+        "since": since,
+        "reset": since > version,
+        "fields": list(ROSTER_FIELDS),
+        "upserts": upserts,
+        "deletes": deletes
+    })
 
 @app.route("/default-icon")
 def default_icon():
@@ -697,6 +840,7 @@ def test_attendance():
         }), 500
 
 if __name__ == "__main__":
+    ensure_initialized()
     print(f"Starting Flask from: {os.getcwd()}")
     print(f"Static folder: {app.static_folder}")
     print(f"Static URL path: {app.static_url_path}")
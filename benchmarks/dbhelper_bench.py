@@ -0,0 +1,173 @@
+"""
+Microbenchmarks for dbhelper.
+Seeds temp databases of increasing size, times each helper, writes the results
+as JSON and fails when a helper is slower than the stored baseline by more than
+the tolerance, or when a point lookup grows with table size.
+
+Usage:
+    python benchmarks/dbhelper_bench.py [--sizes 500,5000,50000] [--days 10]
+        [--json results.json] [--baseline benchmarks/dbhelper_baseline.json]
+        [--save-baseline] [--tolerance 0.25] [--max-lookup-growth 3.0]
+
+CI runs the smaller sizes through pytest (benchmarks/test_dbhelper_bench.py).
+Record the baseline on the CI machine with `--save-baseline` and commit
+benchmarks/dbhelper_baseline.json; without it only the scaling check runs,
+unless CI sets BENCH_REQUIRE_BASELINE=1 to make that a failure.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import dbhelper
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'dbhelper_baseline.json')
+COURSES = ('BSIT', 'BSHM', 'BSCJ', 'BSED', 'BSBA')
+
+# Point lookups: their cost must not follow the table size
+POINT_LOOKUPS = ('getone', 'get_attendance_today')
+
+# Bulk helpers read every row, so they get fewer repeats
+REPEATS = {'get_all_attendance': 3}
+DEFAULT_REPEATS = 200
+
+
+def seed(db_path, students, days, start):
+    dbhelper.DB_PATH = db_path
+    dbhelper.init_database()
+    conn = dbhelper.connect()
+    rng = random.Random(students)
+    conn.executemany(
+        "INSERT INTO students (idno, lastname, firstname, course, level) VALUES (?, ?, ?, ?, ?)",
+        [(f"{i:07d}", f"Last{i}", f"First{i}", rng.choice(COURSES), str(rng.randint(1, 4)))
+         for i in range(students)]
+    )
+    first_day = dbhelper.day_number(start)
+    conn.executemany(
+        "INSERT INTO attendance (student_id, day, time_in) VALUES (?, ?, ?)",
+        ((student_id, first_day + d, 25200 + rng.randint(0, 7200))
+         for d in range(days) for student_id in range(1, students + 1)
+         if rng.random() < 0.9)
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_calls(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return round(statistics.median(samples), 2)
+
+
+def bench_size(students, days):
+    start = '2025-01-06'
+    last_day = (datetime.strptime(start, '%Y-%m-%d') + timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    rng = random.Random(0)
+    idnos = [f"{rng.randrange(students):07d}" for _ in range(DEFAULT_REPEATS)]
+    counter = iter(range(10 ** 9))
+
+    # seed() points dbhelper at the temp database; put it back afterwards
+    previous_db_path = dbhelper.DB_PATH
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            seed(os.path.join(tmp, 'bench.db'), students, days, start)
+
+            helpers = {
+                'getone': lambda: dbhelper.getone('students', idno=rng.choice(idnos)),
+                'get_attendance_today': lambda: dbhelper.get_attendance_today(rng.choice(idnos), last_day),
+                'get_attendance_by_date': lambda: dbhelper.get_attendance_by_date(last_day),
+                'record_attendance': lambda: dbhelper.record_attendance(rng.choice(idnos)),
+                'addrecord': lambda: dbhelper.addrecord(
+                    'students', idno=f"N{next(counter)}", lastname='Bench', firstname='Mark',
+                    course='BSIT', level='1'),
+                'get_all_attendance': lambda: dbhelper.get_all_attendance(),
+            }
+            results = {}
+            for name, fn in helpers.items():
+                results[name] = time_calls(fn, REPEATS.get(name, DEFAULT_REPEATS))
+                print(f"  {name:<24} {results[name]:12.2f} us")
+    finally:
+        dbhelper.DB_PATH = previous_db_path
+    return results
+
+
+def compare_baseline(results, baseline, tolerance):
+    failures = []
+    for size, helpers in baseline.get('results', {}).items():
+        for name, base_us in helpers.items():
+            current = results.get(size, {}).get(name)
+            if current is not None and current > base_us * (1 + tolerance):
+                failures.append(f"{name} at {size} students: {current} us vs baseline {base_us} us "
+                                f"(+{(current / base_us - 1) * 100:.0f}%)")
+    return failures
+
+
+def check_scaling(results, sizes, max_growth):
+    failures = []
+    smallest, largest = str(sizes[0]), str(sizes[-1])
+    for name in POINT_LOOKUPS:
+        growth = results[largest][name] / results[smallest][name]
+        print(f"{name} grew {growth:.2f}x from {smallest} to {largest} students")
+        if growth > max_growth:
+            failures.append(f"{name} grew {growth:.2f}x over a {sizes[-1] // sizes[0]}x larger table")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='500,5000,50000',
+                        help="comma-separated student counts")
+    parser.add_argument('--days', type=int, default=10, help="days of attendance to seed")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown over the baseline (0.25 = 25%%)")
+    parser.add_argument('--max-lookup-growth', type=float, default=3.0,
+                        help="largest allowed point-lookup slowdown from smallest to largest size")
+    args = parser.parse_args()
+
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    results = {}
+    for students in sizes:
+        print(f"{students} students, {args.days} days")
+        results[str(students)] = bench_size(students, args.days)
+
+    output = {'days': args.days, 'unit': 'us', 'results': results}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    failures = []
+    if len(sizes) > 1:
+        failures += check_scaling(results, sizes, args.max_lookup_growth)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            failures += compare_baseline(results, json.load(f), args.tolerance)
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark for the Flask app.
+Spawns fresh interpreters and times `import app` and the first-request init,
+so import-time regressions show up before they slow down worker spawn.
+Every run gets a fresh copy of school.db and its own working directory, so
+migrations and the upload folder never touch the real data.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--json startup.json] [--budget-ms 300]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'school.db')
+
+SNIPPETS = {
+    'import_app': "import app",
+    'import_and_init': "import app; app.ensure_initialized()",
+}
+
+TIMER = (
+    "import time, sys; _t = time.perf_counter(); {code}; "
+    "sys.stdout.write(repr(time.perf_counter() - _t))"
+)
+
+
+def time_snippet(code, runs):
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'school.db')
+            if os.path.exists(SOURCE_DB):
+                shutil.copyfile(SOURCE_DB, db_path)
+            out = subprocess.run(
+                [sys.executable, "-c", TIMER.format(code=code)],
+                cwd=tmp, capture_output=True, text=True, check=True,
+                env={**os.environ, 'STARTUP_PROFILE': '0', 'SCHOOL_DB': db_path,
+                     'PYTHONPATH': os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))},
+            )
+        samples.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--budget-ms', type=float,
+                        help="fail if the median import_and_init time exceeds this")
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in SNIPPETS.items():
+        samples = time_snippet(code, args.runs)
+        results[name] = {
+            'median_ms': round(statistics.median(samples), 2),
+            'min_ms': round(min(samples), 2),
+            'max_ms': round(max(samples), 2),
+        }
+        print(f"{name:<16} median {results[name]['median_ms']:8.2f} ms  "
+              f"min {results[name]['min_ms']:8.2f} ms  max {results[name]['max_ms']:8.2f} ms")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'runs': args.runs, 'results': results}, f, indent=2)
+
+    if args.budget_ms is not None and results['import_and_init']['median_ms'] > args.budget_ms:
+        print(f"FAIL: cold start {results['import_and_init']['median_ms']} ms "
+              f"exceeds budget {args.budget_ms} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""
+Pytest entry point for the dbhelper microbenchmarks, so CI fails on regressions:
+    python -m pytest benchmarks
+
+Point lookups must not grow with table size. Timings are compared against
+DEFAULT_BASELINE when it exists; timings are machine-specific, so generate it
+once on the CI runner and commit it from there:
+    python benchmarks/dbhelper_bench.py --save-baseline
+
+Environment:
+    BENCH_JSON              write the results here (default: the pytest temp dir)
+    BENCH_TOLERANCE         allowed slowdown over the baseline (default 0.25)
+    BENCH_REQUIRE_BASELINE  set to 1 in CI to fail, not skip, without a baseline
+"""
+import json
+import os
+
+import pytest
+
+from dbhelper_bench import DEFAULT_BASELINE, bench_size, check_scaling, compare_baseline
+
+# Smallest sizes of the script defaults, so a default baseline covers them
+SIZES = (500, 5000)
+DAYS = 10
+TOLERANCE = float(os.environ.get('BENCH_TOLERANCE', 0.25))
+REQUIRE_BASELINE = os.environ.get('BENCH_REQUIRE_BASELINE', '') not in ('', '0')
+MAX_LOOKUP_GROWTH = 3.0
+
+
+@pytest.fixture(scope='module')
+def results(tmp_path_factory):
+    results = {str(students): bench_size(students, DAYS) for students in SIZES}
+
+    path = os.environ.get('BENCH_JSON') or str(tmp_path_factory.mktemp('bench') / 'dbhelper_bench.json')
+    with open(path, 'w') as f:
+        json.dump({'days': DAYS, 'unit': 'us', 'results': results}, f, indent=2)
+    print(f"Benchmark results written to {path}")
+    return results
+
+
+def test_point_lookups_do_not_grow_with_table_size(results):
+    assert check_scaling(results, SIZES, MAX_LOOKUP_GROWTH) == []
+
+
+def test_no_regression_against_baseline(results):
+    if not os.path.exists(DEFAULT_BASELINE):
+        message = f"no baseline at {DEFAULT_BASELINE}; run dbhelper_bench.py --save-baseline"
+        if REQUIRE_BASELINE:
+            pytest.fail(message)
+        pytest.skip(message)
+    with open(DEFAULT_BASELINE) as f:
+        baseline = json.load(f)
+    assert baseline['days'] == DAYS, f"baseline was recorded with {baseline['days']} days, tests use {DAYS}"
+    assert compare_baseline(results, baseline, TOLERANCE) == []
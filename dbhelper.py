@@ -1,19 +1,59 @@
 """
 Database Helper Module
 Handles all database operations for the Student Attendance System
+
+Usage:
+    python dbhelper.py init    create tables, migrate attendance and build rollups
 """
+import argparse
 import sqlite3
 import os
+import time
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+# Database file; SCHOOL_DB points it elsewhere (benchmarks use temp databases)
+DB_PATH = os.environ.get('SCHOOL_DB') or os.path.join(os.path.dirname(os.path.abspath(__file__)), "school.db")
 
 # Connect to the database
 def connect():
-    base_path = os.path.dirname(os.path.abspath(__file__))
-    db_path = os.path.join(base_path, "school.db")
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
+    # Off by default in SQLite; needed for attendance ON DELETE CASCADE
+    conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
+# Compact attendance layout: integer student FK, day number since 1970-01-01
+# and seconds since midnight. Use the ATTENDANCE_*_SQL fragments to read it back.
+ATTENDANCE_COLUMNS_SQL = '''
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    time_in INTEGER NOT NULL,
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+'''
+
+# Days per attendance_presence row; marks[i] is day block * PRESENCE_BLOCK + i
+PRESENCE_BLOCK = 512
+
+# Trigger statements marking the day of the {row} (NEW or OLD) attendance row
+PRESENCE_MARK_SQL = f'''
+    INSERT INTO attendance_presence (student_id, block, marks)
+    VALUES ({{row}}.student_id, {{row}}.day / {PRESENCE_BLOCK}, hex(zeroblob({PRESENCE_BLOCK // 2})))
+    ON CONFLICT (student_id, block) DO NOTHING;
+    UPDATE attendance_presence
+    SET marks = substr(marks, 1, {{row}}.day % {PRESENCE_BLOCK}) || '1' || substr(marks, {{row}}.day % {PRESENCE_BLOCK} + 2)
+    WHERE student_id = {{row}}.student_id AND block = {{row}}.day / {PRESENCE_BLOCK};
+'''
+# A day is only unmarked once no scan is left for it
+PRESENCE_UNMARK_SQL = f'''
+    UPDATE attendance_presence
+    SET marks = substr(marks, 1, {{row}}.day % {PRESENCE_BLOCK}) || '0' || substr(marks, {{row}}.day % {PRESENCE_BLOCK} + 2)
+    WHERE student_id = {{row}}.student_id AND block = {{row}}.day / {PRESENCE_BLOCK}
+      AND NOT EXISTS (SELECT 1 FROM attendance WHERE student_id = {{row}}.student_id AND day = {{row}}.day);
+'''
+
 # Initialize tables
 def init_database():
     conn = connect()
@@ -41,20 +81,250 @@ def init_database():
         )
     ''')
 
+    # Section views (course/level filters) read only their own students through this
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_students_section ON students (course, level, idno)")
+
+    cur.execute(f"CREATE TABLE IF NOT EXISTS attendance ({ATTENDANCE_COLUMNS_SQL})")
+
+    migrate_attendance_layout(conn)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_attendance_day ON attendance (day, time_in)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_attendance_student_day ON attendance (student_id, day)")
+
+    # Presence rollup: a '0'/'1' mark per day a student scanned in, PRESENCE_BLOCK
+    # days to a row, so absence summaries read one short string per student
+    ensure_rollup(
+        conn, 'attendance_presence',
+        '''
+            CREATE TABLE attendance_presence (
+                student_id INTEGER NOT NULL,
+                block INTEGER NOT NULL,
+                marks TEXT NOT NULL,
+                PRIMARY KEY (student_id, block),
+                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        ''',
+        [
+            f'''
+                CREATE TRIGGER IF NOT EXISTS presence_attendance_insert
+                AFTER INSERT ON attendance
+                BEGIN
+                    {PRESENCE_MARK_SQL.format(row='NEW')}
+                END
+            ''',
+            f'''
+                CREATE TRIGGER IF NOT EXISTS presence_attendance_update
+                AFTER UPDATE OF student_id, day ON attendance
+                BEGIN
+                    {PRESENCE_UNMARK_SQL.format(row='OLD')}
+                    {PRESENCE_MARK_SQL.format(row='NEW')}
+                END
+            ''',
+            f'''
+                CREATE TRIGGER IF NOT EXISTS presence_attendance_delete
+                AFTER DELETE ON attendance
+                BEGIN
+                    {PRESENCE_UNMARK_SQL.format(row='OLD')}
+                END
+            ''',
+        ],
+        backfill_presence
+    )
+
+    # Arrival rollup: scans per (day, minute of day), kept current by triggers so
+    # school-wide analytics read a few thousand rows instead of every scan
+    ensure_rollup(
+        conn, 'arrival_minutes',
+        '''
+            CREATE TABLE arrival_minutes (
+                day INTEGER NOT NULL,
+                minute INTEGER NOT NULL,
+                scans INTEGER NOT NULL,
+                PRIMARY KEY (day, minute)
+            ) WITHOUT ROWID
+        ''',
+        [
+            '''
+                CREATE TRIGGER IF NOT EXISTS arrival_attendance_insert
+                AFTER INSERT ON attendance
+                BEGIN
+                    INSERT INTO arrival_minutes (day, minute, scans) VALUES (NEW.day, NEW.time_in / 60, 1)
+                    ON CONFLICT (day, minute) DO UPDATE SET scans = scans + excluded.scans;
+                END
+            ''',
+            '''
+                CREATE TRIGGER IF NOT EXISTS arrival_attendance_update
+                AFTER UPDATE OF day, time_in ON attendance
+                BEGIN
+                    UPDATE arrival_minutes SET scans = scans - 1
+                    WHERE day = OLD.day AND minute = OLD.time_in / 60;
+                    INSERT INTO arrival_minutes (day, minute, scans) VALUES (NEW.day, NEW.time_in / 60, 1)
+                    ON CONFLICT (day, minute) DO UPDATE SET scans = scans + excluded.scans;
+                END
+            ''',
+            # Also fires for rows removed by the students ON DELETE CASCADE
+            '''
+                CREATE TRIGGER IF NOT EXISTS arrival_attendance_delete
+                AFTER DELETE ON attendance
+                BEGIN
+                    UPDATE arrival_minutes SET scans = scans - 1
+                    WHERE day = OLD.day AND minute = OLD.time_in / 60;
+                END
+            ''',
+        ],
+        backfill_arrival_minutes
+    )
+
+    # Roster change log: every student insert/update/delete bumps the version
     cur.execute('''
-        CREATE TABLE IF NOT EXISTS attendance (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+        CREATE TABLE IF NOT EXISTS roster_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
             idno VARCHAR(10) NOT NULL,
-            date DATE NOT NULL,
-            time_in TIME NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (idno) REFERENCES students(idno)
+            op VARCHAR(6) NOT NULL
         )
     ''')
 
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS roster_students_insert
+        AFTER INSERT ON students
+        BEGIN
+            INSERT INTO roster_changes (idno, op) VALUES (NEW.idno, 'upsert');
+        END
+    ''')
+
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS roster_students_update
+        AFTER UPDATE ON students
+        BEGIN
+            INSERT INTO roster_changes (idno, op)
+                SELECT OLD.idno, 'delete' WHERE OLD.idno != NEW.idno;
+            INSERT INTO roster_changes (idno, op) VALUES (NEW.idno, 'upsert');
+        END
+    ''')
+
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS roster_students_delete
+        AFTER DELETE ON students
+        BEGIN
+            INSERT INTO roster_changes (idno, op) VALUES (OLD.idno, 'delete');
+        END
+    ''')
+
+    # Seed the log once so students created before versioning are covered
+    cur.execute('''
+        INSERT INTO roster_changes (idno, op)
+        SELECT idno, 'upsert' FROM students
+        WHERE NOT EXISTS (SELECT 1 FROM roster_changes)
+        ORDER BY id
+    ''')
+
     conn.commit()
     conn.close()
 
+def migrate_attendance_layout(conn):
+    """
+    Rebuild the attendance table in the current layout, in place. Handles the
+    old string layout (idno, date, time_in, created_at) and compact tables
+    created before the ON DELETE CASCADE foreign key.
+    Rows whose student no longer exists cannot be kept.
+    """
+    cur = conn.cursor()
+    # Take the write lock before looking at the layout, so when several
+    # workers start at once the ones that wait see the already rebuilt table
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute("PRAGMA table_info(attendance)")
+        columns = [row['name'] for row in cur.fetchall()]
+        cur.execute("PRAGMA foreign_key_list(attendance)")
+        cascades = any(row['on_delete'] == 'CASCADE' for row in cur.fetchall())
+
+        if 'idno' in columns:
+            source = '''
+                SELECT
+                    a.id,
+                    s.id,
+                    CAST(julianday(a.date) - 2440587.5 AS INTEGER),
+                    CAST(strftime('%s', '1970-01-01 ' || substr(a.time_in, 1, 8)) AS INTEGER)
+                FROM attendance a
+                JOIN students s ON s.idno = a.idno
+            '''
+        elif not cascades:
+            source = '''
+                SELECT a.id, a.student_id, a.day, a.time_in
+                FROM attendance a
+                JOIN students s ON s.id = a.student_id
+            '''
+        else:
+            conn.commit()
+            return
+
+        cur.execute(f"CREATE TABLE attendance_compact ({ATTENDANCE_COLUMNS_SQL})")
+        cur.execute(f"INSERT INTO attendance_compact (id, student_id, day, time_in) {source}")
+        migrated = cur.rowcount
+        cur.execute("SELECT COUNT(*) FROM attendance")
+        dropped = cur.fetchone()[0] - migrated
+        cur.execute("DROP TABLE attendance")
+        cur.execute("ALTER TABLE attendance_compact RENAME TO attendance")
+        # Rebuilt with the table's new triggers by init_database
+        cur.execute("DROP TABLE IF EXISTS attendance_presence")
+        cur.execute("DROP TABLE IF EXISTS arrival_minutes")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    print(f"[MIGRATE] Attendance rebuilt in compact layout ({migrated} rows)")
+    if dropped:
+        print(f"[MIGRATE] Dropped {dropped} attendance rows for students that no longer exist")
+
+def ensure_rollup(conn, table, create_sql, trigger_sqls, backfill):
+    """
+    Create a trigger-maintained rollup of attendance and backfill it, all in
+    one write transaction, so no scan can land between the triggers going
+    live and the backfill. `backfill(conn)` only runs when the table is new.
+    Triggers are (re)created every time, since rebuilding attendance drops them.
+    """
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+        if cur.fetchone() is None:
+            cur.execute(create_sql)
+            backfill(conn)
+        for trigger_sql in trigger_sqls:
+            cur.execute(trigger_sql)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+def backfill_presence(conn):
+    """Build attendance_presence from existing scans, one student at a time"""
+    scans = conn.cursor()
+    scans.row_factory = None
+    scans.execute("SELECT student_id, day FROM attendance ORDER BY student_id, day")
+
+    def rows():
+        for student_id, student_scans in groupby(scans, key=itemgetter(0)):
+            blocks = {}
+            for _, day in student_scans:
+                marks = blocks.get(day // PRESENCE_BLOCK)
+                if marks is None:
+                    marks = blocks[day // PRESENCE_BLOCK] = bytearray(b'0' * PRESENCE_BLOCK)
+                marks[day % PRESENCE_BLOCK] = ord('1')
+            for block, marks in blocks.items():
+                yield student_id, block, marks.decode()
+
+    conn.executemany("INSERT INTO attendance_presence (student_id, block, marks) VALUES (?, ?, ?)", rows())
+
+def backfill_arrival_minutes(conn):
+    """Build arrival_minutes from existing scans"""
+    conn.execute('''
+        INSERT INTO arrival_minutes (day, minute, scans)
+        SELECT day, time_in / 60, COUNT(*) FROM attendance GROUP BY day, time_in / 60
+        ON CONFLICT (day, minute) DO UPDATE SET scans = scans + excluded.scans
+    ''')
+
 # FUNCTIONS 
 
 def getall(table):
@@ -184,53 +454,125 @@ def get_student_by_idno(idno):
     conn.close()
     return student
 
+def student_filter_sql(course=None, level=None, alias='s'):
+    """Return (sql, params) restricting students to a course and/or level"""
+    clauses = []
+    params = []
+    if course:
+        clauses.append(f"{alias}.course = ?")
+        params.append(course)
+    if level:
+        clauses.append(f"{alias}.level = ?")
+        params.append(level)
+    return "".join(f" AND {clause}" for clause in clauses), params
+
+def get_students(course=None, level=None):
+    filter_sql, filter_params = student_filter_sql(course, level)
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(f"SELECT * FROM students s WHERE 1 = 1{filter_sql} ORDER BY s.idno", filter_params)
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+def get_sections():
+    """Distinct (course, level) pairs, read from the section index"""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT course, level FROM students ORDER BY course, level")
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+def get_referenced_images():
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT image_filename FROM students WHERE image_filename IS NOT NULL")
+    filenames = {row[0] for row in cur.fetchall()}
+    conn.close()
+    return filenames
+
 # ATTENDANCE FUNCTIONS
 
+# SQL fragments that turn the compact attendance columns (alias `a`) back into
+# the 'YYYY-MM-DD' / 'HH:MM:SS' / '8:05 AM' strings the pages display
+ATTENDANCE_DATE_SQL = "date(a.day * 86400, 'unixepoch')"
+ATTENDANCE_TIME_SQL = "time(a.time_in, 'unixepoch')"
+ATTENDANCE_TIME_12H_SQL = (
+    "printf('%d:%02d %s', (a.time_in / 3600 + 11) % 12 + 1, a.time_in / 60 % 60, "
+    "CASE WHEN a.time_in < 43200 THEN 'AM' ELSE 'PM' END)"
+)
+# Day number for a 'YYYY-MM-DD' parameter
+DAY_PARAM_SQL = "CAST(julianday(?) - 2440587.5 AS INTEGER)"
+EPOCH = datetime(1970, 1, 1)
+
 def record_attendance(idno):
     now = datetime.now()
-    date = now.strftime('%Y-%m-%d')
-    time_in = now.strftime('%H:%M:%S')
-    return addrecord('attendance', idno=idno, date=date, time_in=time_in)
+    day = (now - EPOCH).days
+    time_in = now.hour * 3600 + now.minute * 60 + now.second
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+            INSERT INTO attendance (student_id, day, time_in)
+            SELECT id, ?, ? FROM students WHERE idno=?
+        ''', (day, time_in, idno))
+        conn.commit()
+        return cur.rowcount > 0
+    except Exception as e:
+        print("ERROR:", e)
+        return False
+    finally:
+        conn.close()
 
 def get_all_attendance():
     conn = connect()
     cur = conn.cursor()
-    cur.execute('''
+    cur.execute(f'''
         SELECT 
             a.id,
-            a.idno,
-            COALESCE(s.lastname, 'N/A') as lastname,
-            COALESCE(s.firstname, 'N/A') as firstname,
-            COALESCE(s.course, 'N/A') as course,
-            COALESCE(s.level, 'N/A') as level,
-            a.date,
-            a.time_in
+            s.idno,
+            s.lastname,
+            s.firstname,
+            s.course,
+            s.level,
+            {ATTENDANCE_DATE_SQL} as date,
+            {ATTENDANCE_TIME_SQL} as time_in,
+            {ATTENDANCE_TIME_12H_SQL} as time_in_12h
         FROM attendance a
-        LEFT JOIN students s ON a.idno = s.idno
-        ORDER BY a.date DESC, a.time_in DESC
+        JOIN students s ON s.id = a.student_id
+        ORDER BY a.day DESC, a.time_in DESC
     ''')
     rows = cur.fetchall()
     conn.close()
     return rows
 
-def get_attendance_by_date(date):
+def get_attendance_by_date(date, course=None, level=None):
+    filter_sql, filter_params = student_filter_sql(course, level)
+    # A course view starts from that course's students (idx_students_section)
+    # and probes their attendance, instead of reading the whole school's day.
+    # The index cannot seek on level alone, so level-only views read the day.
+    if course:
+        join_sql = "students s CROSS JOIN attendance a ON a.student_id = s.id"
+    else:
+        join_sql = "attendance a JOIN students s ON s.id = a.student_id"
     conn = connect()
     cur = conn.cursor()
-    cur.execute('''
+    cur.execute(f'''
         SELECT 
             a.id,
-            a.idno,
-            COALESCE(s.lastname, 'N/A') as lastname,
-            COALESCE(s.firstname, 'N/A') as firstname,
-            COALESCE(s.course, 'N/A') as course,
-            COALESCE(s.level, 'N/A') as level,
-            a.date,
-            a.time_in
-        FROM attendance a
-        LEFT JOIN students s ON a.idno = s.idno
-        WHERE DATE(a.date) = ?
+            s.idno,
+            s.lastname,
+            s.firstname,
+            s.course,
+            s.level,
+            {ATTENDANCE_DATE_SQL} as date,
+            {ATTENDANCE_TIME_SQL} as time_in,
+            {ATTENDANCE_TIME_12H_SQL} as time_in_12h
+        FROM {join_sql}
+        WHERE a.day = {DAY_PARAM_SQL}{filter_sql}
         ORDER BY a.time_in ASC
-    ''', (date,))
+    ''', [date] + filter_params)
     rows = cur.fetchall()
     conn.close()
     return rows
@@ -238,10 +580,236 @@ def get_attendance_by_date(date):
 def get_attendance_today(idno, date):
     conn = connect()
     cur = conn.cursor()
-    cur.execute(
-        "SELECT * FROM attendance WHERE idno=? AND date=?",
-        (idno, date)
-    )
+    cur.execute(f'''
+        SELECT
+            a.id,
+            s.idno,
+            {ATTENDANCE_DATE_SQL} as date,
+            {ATTENDANCE_TIME_SQL} as time_in,
+            {ATTENDANCE_TIME_12H_SQL} as time_in_12h
+        FROM students s
+        JOIN attendance a ON a.student_id = s.id
+        WHERE s.idno=? AND a.day = {DAY_PARAM_SQL}
+    ''', (idno, date))
     record = cur.fetchone()
     conn.close()
     return record
+
+# ABSENCE FUNCTIONS
+
+def day_number(date):
+    """Day number (days since 1970-01-01) for a 'YYYY-MM-DD' string"""
+    return (datetime.strptime(date, '%Y-%m-%d') - EPOCH).days
+
+def get_absentees(date, course=None, level=None):
+    """
+    Students with no attendance on `date`, optionally for one course/level.
+    Anti-join on the (student_id, day) index, one probe per student.
+    """
+    filter_sql, filter_params = student_filter_sql(course, level)
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute(f'''
+        SELECT s.id, s.idno, s.lastname, s.firstname, s.course, s.level
+        FROM students s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM attendance a
+            WHERE a.student_id = s.id AND a.day = ?
+        ){filter_sql}
+        ORDER BY s.course, s.level, s.lastname, s.firstname
+    ''', [day_number(date)] + filter_params)
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+def get_absence_summary(start, end, course=None, level=None):
+    """
+    Students absent at least once between `start` and `end` (inclusive).
+    School days are the days on which anyone scanned in, so weekends and
+    holidays do not count. current_streak is the run of absences up to the
+    last school day; longest_streak is the longest run anywhere in the range.
+    Returns (school_days, rows), most-absent students first.
+    """
+    first, last = day_number(start), day_number(end)
+    filter_sql, filter_params = student_filter_sql(course, level)
+    conn = connect()
+    cur = conn.cursor()
+
+    # Distinct days by hopping along idx_attendance_day, one seek per day
+    cur.execute('''
+        WITH RECURSIVE days(day) AS (
+            SELECT MIN(day) FROM attendance WHERE day >= ?
+            UNION ALL
+            SELECT (SELECT MIN(day) FROM attendance WHERE day > days.day)
+            FROM days WHERE days.day IS NOT NULL
+        )
+        SELECT day FROM days WHERE day <= ?
+    ''', (first, last))
+    days = [row[0] for row in cur.fetchall()]
+    if not days:
+        conn.close()
+        return 0, []
+
+    # Each student's marks over [first, last], one substr per presence block;
+    # a block with no row means no scans, so it reads as all '0'
+    pieces, params = [], []
+    for block in range(first // PRESENCE_BLOCK, last // PRESENCE_BLOCK + 1):
+        lo = max(first, block * PRESENCE_BLOCK)
+        hi = min(last, block * PRESENCE_BLOCK + PRESENCE_BLOCK - 1)
+        pieces.append('''COALESCE((
+            SELECT substr(p.marks, ?, ?) FROM attendance_presence p
+            WHERE p.student_id = s.id AND p.block = ?
+        ), ?)''')
+        params += [lo - block * PRESENCE_BLOCK + 1, hi - lo + 1, block, '0' * (hi - lo + 1)]
+
+    cur.row_factory = None
+    cur.execute(f'''
+        SELECT s.id, s.idno, s.lastname, s.firstname, s.course, s.level, {' || '.join(pieces)}
+        FROM students s
+        WHERE 1 = 1{filter_sql}
+    ''', params + filter_params)
+    students = cur.fetchall()
+    conn.close()
+
+    # Keep school days only: one character per school day, '0' for absent
+    pick = itemgetter(*[day - first for day in days])
+    summaries = []
+    for student in students:
+        marks = ''.join(pick(student[6]))
+        days_present = marks.count('1')
+        if days_present < len(days):
+            current_streak = len(marks) - len(marks.rstrip('0'))
+            # Streaks are short, so growing a '0' run and searching for it is
+            # cheaper than splitting every student's marks
+            longest_streak = max(current_streak, 1)
+            while '0' * (longest_streak + 1) in marks:
+                longest_streak += 1
+            summaries.append((-current_streak, days_present - len(days), student[1],
+                              student, days_present, longest_streak))
+    summaries.sort(key=itemgetter(0, 1, 2))
+
+    rows = [
+        {
+            'id': student[0], 'idno': student[1], 'lastname': student[2],
+            'firstname': student[3], 'course': student[4], 'level': student[5],
+            'days_present': days_present,
+            'days_absent': len(days) - days_present,
+            'current_streak': -negative_streak,
+            'longest_streak': longest_streak,
+        }
+        for negative_streak, _, _, student, days_present, longest_streak in summaries
+    ]
+    return len(days), rows
+
+# ANALYTICS FUNCTIONS
+
+def get_arrival_counts(start, end, course=None, level=None):
+    """
+    Scan counts per (day, minute of day) between `start` and `end` as three
+    parallel lists (days, minutes, counts), ready to load into arrays.
+    School-wide counts come straight from the arrival_minutes rollup; a section
+    filter groups that section's scans, one index seek per student.
+    """
+    filter_sql, filter_params = student_filter_sql(course, level)
+    conn = connect()
+    cur = conn.cursor()
+    cur.row_factory = None
+    if filter_sql:
+        cur.execute(f'''
+            SELECT a.day, a.time_in / 60 AS minute, COUNT(*)
+            FROM students s CROSS JOIN attendance a ON a.student_id = s.id
+            WHERE a.day BETWEEN ? AND ?{filter_sql}
+            GROUP BY a.day, minute
+        ''', [day_number(start), day_number(end)] + filter_params)
+    else:
+        cur.execute('''
+            SELECT day, minute, scans FROM arrival_minutes
+            WHERE day BETWEEN ? AND ? AND scans > 0
+        ''', (day_number(start), day_number(end)))
+    rows = cur.fetchall()
+    conn.close()
+    if not rows:
+        return [], [], []
+    days, minutes, counts = zip(*rows)
+    return list(days), list(minutes), list(counts)
+
+# ROSTER FUNCTIONS
+
+ROSTER_FIELDS = ('idno', 'lastname', 'firstname', 'course', 'level')
+
+def get_roster_version():
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM roster_changes")
+    version = cur.fetchone()[0]
+    conn.close()
+    return version
+
+def get_roster_snapshot():
+    """Return (version, rows) for the whole roster, read in one transaction"""
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM roster_changes")
+        version = cur.fetchone()[0]
+        cur.execute(f"SELECT {', '.join(ROSTER_FIELDS)} FROM students ORDER BY idno")
+        rows = [tuple(row) for row in cur.fetchall()]
+        conn.commit()
+        return version, rows
+    finally:
+        conn.close()
+
+def get_roster_changes(since):
+    """
+    Return (version, upserts, deletes) for every idno touched after `since`.
+    Each idno is reported once, with its current state.
+    """
+    conn = connect()
+    cur = conn.cursor()
+    try:
+        cur.execute("BEGIN")
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM roster_changes")
+        version = cur.fetchone()[0]
+        cur.execute('''
+            SELECT c.idno, s.lastname, s.firstname, s.course, s.level,
+                   s.id IS NOT NULL AS present
+            FROM (
+                SELECT idno, MAX(version) AS version
+                FROM roster_changes
+                WHERE version > ?
+                GROUP BY idno
+            ) c
+            LEFT JOIN students s ON s.idno = c.idno
+            ORDER BY c.version
+        ''', (since,))
+        rows = cur.fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+
+    upserts = [tuple(row)[:len(ROSTER_FIELDS)] for row in rows if row['present']]
+    deletes = [row['idno'] for row in rows if not row['present']]
+    return version, upserts, deletes
+
+def get_changed_idnos(since):
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT idno FROM roster_changes WHERE version > ?", (since,))
+    idnos = {row[0] for row in cur.fetchall()}
+    conn.close()
+    return idnos
+
+def main():
+    parser = argparse.ArgumentParser(description="Student attendance database maintenance")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('init', help="create tables, migrate attendance and build rollups; "
+                                "run once after upgrading, before starting workers")
+    parser.parse_args()
+
+    started = time.perf_counter()
+    init_database()
+    print(f"[INIT] {DB_PATH} ready in {time.perf_counter() - started:.1f} s")
+
+if __name__ == "__main__":
+    main()
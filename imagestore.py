@@ -0,0 +1,113 @@
+"""
+Image Store Module
+Content-addressed storage for student photos in UPLOAD_FOLDER,
+plus a garbage collector for files no student references.
+
+Usage:
+    python imagestore.py gc [--folder static/images] [--grace 3600] [--dry-run]
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from dbhelper import get_referenced_images, recordexists
+
+IMAGE_EXT = '.jpg'
+TEMP_PREFIX = '.upload-'
+
+# Files younger than this are never collected, so a photo written just
+# before its student row is saved is not mistaken for an orphan
+DEFAULT_GRACE_SECONDS = 3600
+
+def image_filename(image_bytes):
+    """Filename for the given photo bytes: the SHA-256 of the content"""
+    return hashlib.sha256(image_bytes).hexdigest() + IMAGE_EXT
+
+def save_image(image_bytes, folder):
+    """
+    Store photo bytes under their content hash and return the filename.
+    Identical captures map to the same file and are only written once.
+    """
+    filename = image_filename(image_bytes)
+    filepath = os.path.join(folder, filename)
+    if os.path.exists(filepath):
+        # Refresh mtime so the garbage collector's grace period starts over
+        os.utime(filepath)
+        return filename
+
+    fd, temp_path = tempfile.mkstemp(prefix=TEMP_PREFIX, dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(image_bytes)
+        # mkstemp creates 0600; photos are served as static files
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, filepath)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return filename
+
+def remove_image_if_unused(filename, folder):
+    """Delete a photo unless some student still references it"""
+    if not filename or recordexists('students', image_filename=filename):
+        return False
+    filepath = os.path.join(folder, filename)
+    try:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+            return True
+    except Exception as e:
+        print(f"Error removing image {filename}: {e}")
+    return False
+
+def collect_garbage(folder, grace_seconds=DEFAULT_GRACE_SECONDS, dry_run=False):
+    """
+    Reconcile `folder` against students.image_filename in one pass and remove
+    every file older than `grace_seconds` that no student references.
+    Returns a dict with the number of files kept/removed and bytes reclaimed.
+    """
+    referenced = get_referenced_images()
+    cutoff = time.time() - grace_seconds
+    stats = {'kept': 0, 'removed': 0, 'bytes_reclaimed': 0}
+
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name in referenced:
+                stats['kept'] += 1
+                continue
+            info = entry.stat()
+            if info.st_mtime > cutoff:
+                stats['kept'] += 1
+                continue
+            if not dry_run:
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    print(f"Error removing orphan {entry.name}: {e}")
+                    stats['kept'] += 1
+                    continue
+            print(f"[GC] {'Would remove' if dry_run else 'Removed'} {entry.name}")
+            stats['removed'] += 1
+            stats['bytes_reclaimed'] += info.st_size
+
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Student photo store maintenance")
+    sub = parser.add_subparsers(dest='command', required=True)
+    gc = sub.add_parser('gc', help="remove photos no student references")
+    gc.add_argument('--folder', default=os.path.join(os.getcwd(), 'static', 'images'))
+    gc.add_argument('--grace', type=int, default=DEFAULT_GRACE_SECONDS,
+                    help="skip files modified within this many seconds")
+    gc.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    stats = collect_garbage(args.folder, args.grace, args.dry_run)
+    print(f"[GC] kept {stats['kept']}, removed {stats['removed']}, "
+          f"reclaimed {stats['bytes_reclaimed']} bytes")
+
+if __name__ == "__main__":
+    main()
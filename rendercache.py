@@ -0,0 +1,88 @@
+"""
+Render Cache Module
+Bounded LRU cache for page data that no longer changes (closed attendance days),
+optionally mirrored to disk so it survives worker restarts. The disk mirror is
+bounded too: least recently used files beyond max_entries are deleted.
+
+Entries carry the roster version they were built at and the idnos they show.
+The caller checks them against the roster change log, so an edit made by any
+worker invalidates exactly the entries that show the edited student.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+class RenderCache:
+    def __init__(self, max_entries=256, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, key):
+        """Return the entry dict (version, idnos, value) for `key`, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            # mtime is the disk mirror's recency, see _prune_disk
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, version, idnos, value):
+        entry = {'version': version, 'idnos': sorted(idnos), 'value': value}
+        self._remember(key, entry)
+
+        if not self.cache_dir:
+            return
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self._disk_path(key))
+            self._prune_disk()
+        except OSError as e:
+            print(f"Error writing render cache: {e}")
+
+    def _prune_disk(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        entries.sort()
+        # Other workers may be pruning the same directory
+        for _, path in entries[:max(len(entries) - self.max_entries, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,102 @@
+"""
+Request Profiler Module
+Opt-in cProfile runs for logged-in admins. Send the header `X-Profile: 1` or
+add `?_profile=1` to a request, and the `.pstats` dump plus a top-N text
+summary are written to PROFILE_DIR.
+
+Config (app.config, defaulting to the environment variable of the same name):
+    PROFILE_DIR          where profiles go; profiling is disabled when unset
+    PROFILE_SAMPLE_RATE  fraction of flagged requests actually profiled (0-1)
+    PROFILE_MAX_FILES    oldest profiles are deleted beyond this many
+    PROFILE_TOP_N        number of functions in the text summary
+"""
+import io
+import os
+import random
+import re
+import time
+from datetime import datetime
+
+from flask import g, request, session
+
+def init_request_profiler(app):
+    app.config.setdefault('PROFILE_DIR', os.environ.get('PROFILE_DIR'))
+    app.config.setdefault('PROFILE_SAMPLE_RATE', float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0)))
+    app.config.setdefault('PROFILE_MAX_FILES', int(os.environ.get('PROFILE_MAX_FILES', 50)))
+    app.config.setdefault('PROFILE_TOP_N', int(os.environ.get('PROFILE_TOP_N', 25)))
+
+    @app.before_request
+    def start_request_profile():
+        if not wants_profile(app):
+            return
+        import cProfile
+        g.request_profile = cProfile.Profile()
+        g.request_profile_started = time.perf_counter()
+        g.request_profile.enable()
+
+    @app.after_request
+    def finish_request_profile(response):
+        profile = g.get('request_profile')
+        if profile is None:
+            return response
+        profile.disable()
+        elapsed = time.perf_counter() - g.request_profile_started
+        try:
+            filename = save_profile(app, profile, elapsed)
+            response.headers['X-Profile-File'] = filename
+        except Exception as e:
+            print(f"Error saving request profile: {e}")
+        return response
+
+    # after_request is skipped when a view raises, teardown always runs
+    @app.teardown_request
+    def stop_request_profile(exc):
+        profile = g.pop('request_profile', None)
+        if profile is not None:
+            profile.disable()
+
+def wants_profile(app):
+    if not app.config['PROFILE_DIR'] or 'user_id' not in session:
+        return False
+    if request.headers.get('X-Profile') != '1' and request.args.get('_profile') != '1':
+        return False
+    return random.random() < app.config['PROFILE_SAMPLE_RATE']
+
+def save_profile(app, profile, elapsed):
+    """Write `<name>.pstats` and `<name>.txt` and return the base name"""
+    import pstats
+
+    folder = app.config['PROFILE_DIR']
+    os.makedirs(folder, exist_ok=True)
+
+    path_part = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    name = f"{timestamp}_{request.method}_{path_part}_{elapsed * 1000:.0f}ms"
+
+    profile.dump_stats(os.path.join(folder, f"{name}.pstats"))
+
+    summary = io.StringIO()
+    summary.write(f"{request.method} {request.full_path} took {elapsed * 1000:.1f} ms "
+                  f"(user {session.get('user_id')})\n\n")
+    stats = pstats.Stats(profile, stream=summary)
+    stats.sort_stats('cumulative').print_stats(app.config['PROFILE_TOP_N'])
+    with open(os.path.join(folder, f"{name}.txt"), 'w') as f:
+        f.write(summary.getvalue())
+
+    prune_profiles(folder, app.config['PROFILE_MAX_FILES'])
+    print(f"[PROFILE] {request.method} {request.path} {elapsed * 1000:.1f} ms -> {name}")
+    return name
+
+def prune_profiles(folder, max_files):
+    # Names start with a timestamp, so name order is age order
+    dumps = sorted(
+        (entry for entry in os.scandir(folder) if entry.name.endswith('.pstats')),
+        key=lambda entry: entry.name
+    )
+    for entry in dumps[:max(len(dumps) - max_files, 0)]:
+        base = entry.path[:-len('.pstats')]
+        for path in (entry.path, base + '.txt'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,201 @@
+"""
+Scan Gateway
+Optional asyncio front end for kiosks. Serves POST /scan-attendance and a
+GET /live-feed event stream on one event loop, so thousands of idle or slow
+kiosk connections cost a socket each instead of a Flask worker thread.
+SQLite work runs on a small dedicated thread pool through scanning.process_scan,
+so responses match the Flask app exactly.
+
+The live feed lists every scanned student, so it needs the kiosk token the
+Flask app uses for roster sync (KIOSK_TOKEN), sent as an X-Kiosk-Token header
+or, for browser EventSource clients, a ?token= query parameter. Without a
+configured token the feed is closed.
+
+Run it next to the Flask admin app and route /scan-attendance and /live-feed
+to it from the reverse proxy:
+    python scan_gateway.py [--host 0.0.0.0] [--port 8001] [--db-workers 4] [--kiosk-token TOKEN]
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from dbhelper import init_database
+from scanning import process_scan
+
+# Idle keep-alive connections are held this long between requests
+IDLE_TIMEOUT = 300
+# A client that starts a request must finish sending it within this time
+REQUEST_TIMEOUT = 10
+MAX_BODY = 16 * 1024
+# Live-feed comment sent this often so dead clients are noticed
+HEARTBEAT_SECONDS = 15
+# Events buffered per live-feed client before it is dropped as too slow
+FEED_QUEUE_SIZE = 100
+
+class ScanGateway:
+    def __init__(self, db_workers=4, kiosk_token=None):
+        self.db_executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix='scan-db')
+        self.kiosk_token = kiosk_token
+        self.subscribers = set()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await self.read_request(reader)
+                if request is None:
+                    break
+                method, path, query, headers, body = request
+
+                if path == '/live-feed' and method == 'GET' and self.kiosk_authorized(headers, query):
+                    await self.stream_feed(writer)
+                    break
+
+                if path == '/scan-attendance' and method == 'POST':
+                    status, payload = await self.scan(body)
+                elif path == '/live-feed' and method == 'GET':
+                    status, payload = 401, {"success": False, "message": "Kiosk token required"}
+                elif path in ('/scan-attendance', '/live-feed'):
+                    status, payload = 405, {"success": False, "message": "Method not allowed"}
+                else:
+                    status, payload = 404, {"success": False, "message": "Not found"}
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self.send_json(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError:
+            try:
+                await self.send_json(writer, 400, {"success": False, "message": "Bad request"}, False)
+            except (asyncio.TimeoutError, ConnectionError):
+                pass
+        finally:
+            writer.close()
+
+    async def read_request(self, reader):
+        """Return (method, path, query, headers, body), or None when the client went away"""
+        request_line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+        if not request_line.strip():
+            return None
+        method, target, _version = request_line.decode('latin-1').split()
+
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length') or 0)
+        if length > MAX_BODY:
+            raise ValueError("request body too large")
+        body = await asyncio.wait_for(reader.readexactly(length), REQUEST_TIMEOUT) if length else b''
+        url = urlsplit(target)
+        return method, url.path, url.query, headers, body
+
+    def kiosk_authorized(self, headers, query):
+        supplied = headers.get('x-kiosk-token') or parse_qs(query).get('token', [''])[0]
+        return bool(self.kiosk_token) and hmac.compare_digest(supplied.encode(), self.kiosk_token.encode())
+
+    async def scan(self, body):
+        try:
+            data = json.loads(body.decode('utf-8')) if body else {}
+            idno = data.get('idno') if isinstance(data, dict) else None
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            idno = None
+
+        loop = asyncio.get_running_loop()
+        try:
+            payload, status = await loop.run_in_executor(self.db_executor, process_scan, idno)
+        except Exception as e:
+            print(f"Error processing scan for {idno}: {e}")
+            return 500, {"success": False, "message": "Database error recording attendance"}
+
+        if payload.get("success"):
+            self.publish(payload)
+        return status, payload
+
+    def publish(self, payload):
+        student = payload["student"]
+        event = json.dumps({
+            "idno": student["idno"],
+            "lastname": student["lastname"],
+            "firstname": student["firstname"],
+            "course": student["course"],
+            "level": student["level"],
+            "message": payload["message"],
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.subscribers.discard(queue)
+
+    async def stream_feed(self, writer):
+        """Server-sent events: one `data:` line per successful scan"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        await writer.drain()
+
+        queue = asyncio.Queue(maxsize=FEED_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        try:
+            while queue in self.subscribers:
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                    writer.write(f"data: {event}\n\n".encode())
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                await asyncio.wait_for(writer.drain(), REQUEST_TIMEOUT)
+        finally:
+            self.subscribers.discard(queue)
+
+    async def send_json(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Cache-Control: no-cache, no-store, must-revalidate\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+        )
+        await asyncio.wait_for(writer.drain(), REQUEST_TIMEOUT)
+
+async def serve(host, port, db_workers, kiosk_token):
+    gateway = ScanGateway(db_workers, kiosk_token)
+    await asyncio.get_running_loop().run_in_executor(gateway.db_executor, init_database)
+    server = await asyncio.start_server(gateway.handle_connection, host, port, backlog=1024)
+    print(f"[GATEWAY] Serving scans on http://{host}:{port} with {db_workers} DB workers")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio scan gateway for kiosks")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--db-workers', type=int, default=4)
+    parser.add_argument('--kiosk-token', default=os.environ.get('KIOSK_TOKEN'),
+                        help="token required for /live-feed (default: $KIOSK_TOKEN)")
+    args = parser.parse_args()
+    if not args.kiosk_token:
+        print("[GATEWAY] No kiosk token configured; /live-feed is disabled")
+    try:
+        asyncio.run(serve(args.host, args.port, args.db_workers, args.kiosk_token))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
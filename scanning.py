@@ -0,0 +1,48 @@
+"""
+Scanning Module
+Attendance scan logic shared by the Flask app and the asyncio scan gateway,
+so both return the same JSON payloads and status codes.
+"""
+from datetime import datetime
+
+from dbhelper import get_student_by_idno, get_attendance_today, record_attendance
+
+def process_scan(idno):
+    """
+    Record attendance for a scanned idno.
+    Returns (payload, status) where payload is the JSON-ready response body.
+    Ensures time is displayed as H:M AM/PM without seconds.
+    """
+    if not idno:
+        return {"success": False, "message": "No ID provided"}, 400
+
+    student_row = get_student_by_idno(idno)
+    student = dict(student_row) if student_row else None
+    if not student:
+        return {"success": False, "message": f"Student with ID {idno} not found"}, 404
+
+    now = datetime.now()
+    date_str = now.strftime("%Y-%m-%d")
+    time_str = now.strftime("%I:%M %p").lstrip('0')
+    existing = get_attendance_today(idno, date_str)
+
+    if existing:
+        existing_time_12h = existing['time_in_12h']
+
+        return {
+            "success": True,
+            "student": student,
+            "message": f"Attendance already recorded today at {existing_time_12h}"
+        }, 200
+
+    if record_attendance(idno):
+        return {
+            "success": True,
+            "student": student,
+            "message": f"Attendance recorded successfully at {time_str}"
+        }, 200
+    else:
+        return {
+            "success": False,
+            "message": "Database error recording attendance"
+        }, 500